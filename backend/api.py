@@ -1,19 +1,50 @@
 import os
+import hmac
+import time
 import logging
+from contextlib import asynccontextmanager
 from typing import List, Dict, Optional
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import psycopg2
-import psycopg2.extras
-from openai import OpenAI
-from qdrant_client import QdrantClient
-from geopy.distance import geodesic
+from backend import core, intents
+from backend.clients import get_openai_client, get_qdrant_client, get_db_pool, close_clients
+from backend.upstream import get_upstream_gate
 
 load_dotenv()
 
-app = FastAPI()
+logging.basicConfig(level=logging.INFO)
+
+async def warm_up():
+    # Each step is best effort: a missing service should not stop the API from
+    # starting, the first request that needs it will retry and report the error.
+    steps = [
+        ("openai client", lambda: run_in_threadpool(get_openai_client)),
+        ("qdrant client", lambda: run_in_threadpool(get_qdrant_client)),
+        ("database pool", lambda: run_in_threadpool(get_db_pool)),
+        ("outlet snapshot", core.get_outlet_snapshot),
+    ]
+    if core.INTENT_ROUTER:
+        steps.append(("outlet index", core.get_outlet_index))
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            await step()
+            logging.info(f'Warm-up {name}: {(time.perf_counter() - start) * 1000:.1f} ms')
+        except Exception as e:
+            logging.warning(f'Warm-up {name} failed: {e}')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("API_WARM_UP", "1") != "0":
+        await warm_up()
+    yield
+    await close_clients()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,25 +54,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-logging.basicConfig(level=logging.INFO)
-
-client_openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-client_qdrant = QdrantClient(os.getenv("QDRANT_URL"))
-collection_name = "mcd_outlet"
-
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            dbname=os.getenv("POSTGRES_DB"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST"),
-            port=os.getenv("POSTGRES_PORT")
-        )
-        return conn
-    except psycopg2.Error as e:
-        logging.error(f'Database connection error: {e}')
-        return None
+@app.exception_handler(core.ServiceError)
+async def service_error_handler(request: Request, exc: core.ServiceError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
 
 class QueryRequest(BaseModel):
     query: Optional[str] = None
@@ -50,174 +65,44 @@ class MessagesRequest(BaseModel):
     messages: List[Dict[str, str]]
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "FastAPI is running"}
 
-@app.get("/get_outlets")
-def get_outlets():
-    conn = get_db_connection()
-    if conn is None:
-        raise HTTPException(status_code=500, detail="Database connection failed.")
-    try:
-        with conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute('''
-                    SELECT 
-                        a.id,
-                        a.name,
-                        a.address,
-                        a.latitude,
-                        a.longitude,
-                        CASE 
-                            WHEN EXISTS (
-                                SELECT 1 
-                                FROM mcdonald b
-                                WHERE a.id != b.id
-                                AND ST_DWithin(a.geom, b.geom, 10000)
-                            )
-                            THEN 1
-                            ELSE 0
-                        END AS intersects_5km
-                    FROM mcdonald a;
-                ''')
-                outlets = cursor.fetchall()
-                outlet_list = [dict(outlet) for outlet in outlets]
-        return {"data": outlet_list, "status": "success"}
-    except Exception as e:
-        logging.error(f'Error retrieving outlets: {e}')
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+@app.get("/metrics")
+async def metrics():
+    return {"upstream": get_upstream_gate().metrics(), "intent_router": intents.stats.metrics()}
 
-@app.get("/get_outlets_geodesic")
-def get_outlets_geodesic():
-    conn = get_db_connection()
-    if conn is None:
-        raise HTTPException(status_code=500, detail="Database connection failed.")
+@app.post("/admin/invalidate")
+async def invalidate_caches(x_admin_token: Optional[str] = Header(None)):
+    # the API is public, so without a configured token nobody may trigger a reload
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest(x_admin_token or "", admin_token):
+        raise core.ServiceError(403, "Invalid admin token")
     try:
-        with conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute('''
-                    SELECT id, name, address, latitude, longitude
-                    FROM mcdonald;
-                ''')
-                outlets = cursor.fetchall()
-                outlet_list = [dict(outlet) for outlet in outlets]
-
-        for outlet in outlet_list:
-            outlet_coord = (outlet['latitude'], outlet['longitude'])
-            intersects = 0
-            for other in outlet_list:
-                if outlet['id'] != other['id']:
-                    other_coord = (other['latitude'], other['longitude'])
-                    distance_km = geodesic(outlet_coord, other_coord).kilometers
-                    if distance_km <= 10:  # 5km + 5km
-                        intersects = 1
-                        break
-            outlet['intersects_5km'] = intersects
-
-        return {"data": outlet_list, "status": "success"}
+        outlets = await core.invalidate_caches()
     except Exception as e:
-        logging.error(f'Error retrieving outlets: {e}')
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
-
-@app.post("/rag_query")
-def handle_rag_query(request: QueryRequest):
-    user_query = request.query
-    if not user_query:
-        raise HTTPException(status_code=400, detail="Missing 'query' in request body")
-
-    try:
-        response = client_openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=user_query
-        )
-        query_embedding = response.data[0].embedding
-
-        search_results = client_qdrant.search(
-            collection_name=collection_name,
-            query_vector=query_embedding,
-            limit=30
-        )
-        retrieved = [hit.payload for hit in search_results]
-
-        context_text = "\n".join([f"{o['name']} - {o['address']}" for o in retrieved])
-
-        prompt = f"""
-        You are a helpful assistant for McDonald's outlet search.
-
-        User Query: {user_query}
-
-        Matching Outlets:
-        {context_text}
+        logging.error(f'Error reloading outlet snapshot: {e}')
+        raise core.ServiceError(500, str(e))
+    return {"outlets": outlets, "status": "success"}
 
-        Answer the user clearly and concisely based only on the outlets above. Do not use numbered lists. Instead, list items separated by commas for readability.
-        """
-
-        response = client_openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": prompt}]
-        )
-
-        answer = response.choices[0].message.content
+@app.get("/get_outlets")
+async def get_outlets():
+    return {"data": await core.get_outlets(), "status": "success"}
 
-        return {"answer": answer}
+@app.get("/get_outlets_geodesic")
+async def get_outlets_geodesic():
+    return {"data": await core.get_outlets_geodesic(), "status": "success"}
 
-    except Exception as e:
-        logging.error(f'Error in rag_query: {e}')
-        raise HTTPException(status_code=500, detail=str(e))
+@app.post("/rag_query")
+async def handle_rag_query(
+    request: QueryRequest,
+    client_openai=Depends(get_openai_client),
+    client_qdrant=Depends(get_qdrant_client),
+):
+    answer = await core.rag_query(request.query, client_openai, client_qdrant)
+    return {"answer": answer}
 
 @app.post("/non_rag_query")
-def non_rag_query(request: MessagesRequest):
-    messages = request.messages
-    if not messages:
-        raise HTTPException(status_code=400, detail="Missing 'messages' in request body")
-
-    conn = get_db_connection()
-    if conn is None:
-        raise HTTPException(status_code=500, detail="Database connection failed.")
-
-    try:
-        with conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute('''
-                    SELECT id, name, address, telephone, latitude, longitude, categories
-                    FROM mcdonald;
-                ''')
-                outlets = cursor.fetchall()
-                outlet_list = [dict(outlet) for outlet in outlets]
-
-        context_text = "\n".join([
-            f"{o['name']} - {o['address']} - {o.get('categories','')}" for o in outlet_list
-        ])
-
-        system_prompt = {
-            "role": "system",
-            "content": f"""
-You are a helpful assistant for McDonald's outlet search.
-
-All Outlets:
-{context_text}
-
-Use the above outlets data to answer user questions clearly and concisely. Do not use numbered lists. Instead, list items separated by commas for readability.
-"""
-        }
-
-        full_messages = [system_prompt] + messages
-
-        response = client_openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=full_messages
-        )
-        answer = response.choices[0].message.content
-
-        return {"answer": answer}
-
-    except Exception as e:
-        logging.error(f'Error in non_rag_query: {e}')
-        raise HTTPException(status_code=500, detail=str(e))
-
-    finally:
-        conn.close()
\ No newline at end of file
+async def non_rag_query(request: MessagesRequest, client_openai=Depends(get_openai_client)):
+    answer = await core.non_rag_query(request.messages, client_openai)
+    return {"answer": answer}
@@ -0,0 +1,90 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+
+# Per-process singletons. Nothing is created (or even imported) until first
+# use, so importing the API stays cheap and works without any env vars set.
+# The OpenAI and Qdrant clients are async; psycopg2 is blocking, so callers
+# on the event loop go through backend.core which runs queries in a thread.
+_lock = threading.Lock()
+_client_openai = None
+_client_qdrant = None
+_db_pool = None
+_db_slots = None
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+def get_openai_client():
+    global _client_openai
+    if _client_openai is None:
+        with _lock:
+            if _client_openai is None:
+                from openai import AsyncOpenAI
+                _client_openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client_openai
+
+def get_qdrant_client():
+    global _client_qdrant
+    if _client_qdrant is None:
+        with _lock:
+            if _client_qdrant is None:
+                from qdrant_client import AsyncQdrantClient
+                _client_qdrant = AsyncQdrantClient(os.getenv("QDRANT_URL"))
+    return _client_qdrant
+
+def get_db_pool():
+    global _db_pool, _db_slots
+    if _db_pool is None:
+        with _lock:
+            if _db_pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+                maxconn = int(os.getenv("DB_POOL_MAX", "10"))
+                # ThreadedConnectionPool raises PoolError once maxconn connections
+                # are out instead of waiting, so callers queue on this first
+                _db_slots = threading.BoundedSemaphore(maxconn)
+                _db_pool = ThreadedConnectionPool(
+                    int(os.getenv("DB_POOL_MIN", "1")),
+                    maxconn,
+                    dbname=os.getenv("POSTGRES_DB"),
+                    user=os.getenv("POSTGRES_USER"),
+                    password=os.getenv("POSTGRES_PASSWORD"),
+                    host=os.getenv("POSTGRES_HOST"),
+                    port=os.getenv("POSTGRES_PORT")
+                )
+    return _db_pool
+
+@contextmanager
+def db_connection():
+    pool = get_db_pool()
+    slots = _db_slots
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise TimeoutError(f"Timed out after {DB_POOL_TIMEOUT:g}s waiting for a database connection")
+    try:
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn)
+    finally:
+        slots.release()
+
+def fetch_all(sql):
+    from psycopg2.extras import DictCursor
+    with db_connection() as conn:
+        with conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute(sql)
+                return [dict(row) for row in cursor.fetchall()]
+
+async def close_clients():
+    global _client_openai, _client_qdrant, _db_pool
+    with _lock:
+        db_pool, client_qdrant, client_openai = _db_pool, _client_qdrant, _client_openai
+        _client_openai = _client_qdrant = _db_pool = None
+    if db_pool is not None:
+        db_pool.closeall()
+    if client_qdrant is not None:
+        await client_qdrant.close()
+    if client_openai is not None:
+        await client_openai.close()
+    logging.info('Closed upstream clients and database pool')
@@ -0,0 +1,236 @@
+"""Outlet, overlap and RAG logic shared by the HTTP adapters.
+
+Everything here is async and framework agnostic: handlers in backend/api.py
+only translate requests into these calls and ServiceError into responses.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from backend import intents
+from backend.clients import get_openai_client, get_qdrant_client, fetch_all
+from backend.upstream import get_upstream_gate, UpstreamBusy
+
+collection_name = "mcd_outlet"
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHAT_MODEL = "gpt-3.5-turbo"
+
+class ServiceError(Exception):
+    def __init__(self, status_code, detail, headers=None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = headers
+
+OUTLETS_OVERLAP_SQL = '''
+    SELECT
+        a.id,
+        a.name,
+        a.address,
+        a.latitude,
+        a.longitude,
+        CASE
+            WHEN EXISTS (
+                SELECT 1
+                FROM mcdonald b
+                WHERE a.id != b.id
+                AND ST_DWithin(a.geom, b.geom, 10000)
+            )
+            THEN 1
+            ELSE 0
+        END AS intersects_5km
+    FROM mcdonald a;
+'''
+
+OUTLETS_SQL = '''
+    SELECT id, name, address, telephone, latitude, longitude, categories
+    FROM mcdonald;
+'''
+
+# Outlet rows are small and change rarely, so keep one copy per process and
+# reload it at most every OUTLET_SNAPSHOT_TTL seconds.
+OUTLET_SNAPSHOT_TTL = float(os.getenv("OUTLET_SNAPSHOT_TTL", "300"))
+_snapshot_lock = asyncio.Lock()
+_outlet_snapshot = None
+_outlet_snapshot_loaded_at = 0.0
+
+async def get_outlet_snapshot():
+    global _outlet_snapshot, _outlet_snapshot_loaded_at
+    async with _snapshot_lock:
+        if _outlet_snapshot is None or time.monotonic() - _outlet_snapshot_loaded_at > OUTLET_SNAPSHOT_TTL:
+            _outlet_snapshot = await asyncio.to_thread(fetch_all, OUTLETS_SQL)
+            _outlet_snapshot_loaded_at = time.monotonic()
+        return _outlet_snapshot
+
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") != "0"
+_outlet_index = None
+
+async def get_outlet_index():
+    global _outlet_index
+    outlets = await get_outlet_snapshot()
+    if _outlet_index is None or _outlet_index.outlets is not outlets:
+        _outlet_index = await asyncio.to_thread(intents.OutletIndex, outlets)
+    return _outlet_index
+
+async def invalidate_caches():
+    """Drop the outlet snapshot and the index built from it, then reload both."""
+    global _outlet_snapshot, _outlet_index
+    async with _snapshot_lock:
+        _outlet_snapshot = None
+        _outlet_index = None
+    outlets = await get_outlet_snapshot()
+    if INTENT_ROUTER:
+        await get_outlet_index()
+    return len(outlets)
+
+async def _route_intent(question):
+    if not INTENT_ROUTER:
+        return None
+    try:
+        index = await get_outlet_index()
+    except Exception as e:
+        logging.warning(f'Intent router unavailable: {e}')
+        return None
+    return intents.timed_route(index, question)
+
+def _mark_overlaps(outlet_list):
+    from geopy.distance import geodesic
+
+    for outlet in outlet_list:
+        outlet_coord = (outlet['latitude'], outlet['longitude'])
+        intersects = 0
+        for other in outlet_list:
+            if outlet['id'] != other['id']:
+                other_coord = (other['latitude'], other['longitude'])
+                distance_km = geodesic(outlet_coord, other_coord).kilometers
+                if distance_km <= 10:  # 5km + 5km
+                    intersects = 1
+                    break
+        outlet['intersects_5km'] = intersects
+    return outlet_list
+
+async def get_outlets():
+    try:
+        return await asyncio.to_thread(fetch_all, OUTLETS_OVERLAP_SQL)
+    except Exception as e:
+        logging.error(f'Error retrieving outlets: {e}')
+        raise ServiceError(500, str(e))
+
+async def get_outlets_geodesic():
+    try:
+        outlet_list = [
+            {key: o[key] for key in ("id", "name", "address", "latitude", "longitude")}
+            for o in await get_outlet_snapshot()
+        ]
+        # geodesic() is pure Python and O(n^2) here, keep it off the event loop
+        return await asyncio.to_thread(_mark_overlaps, outlet_list)
+    except Exception as e:
+        logging.error(f'Error retrieving outlets: {e}')
+        raise ServiceError(500, str(e))
+
+async def embed(client_openai, text):
+    async def make_call():
+        response = await client_openai.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        return response.data[0].embedding
+    return await get_upstream_gate().call(("embedding", EMBEDDING_MODEL, text), make_call)
+
+async def complete(client_openai, messages):
+    async def make_call():
+        response = await client_openai.chat.completions.create(model=CHAT_MODEL, messages=messages)
+        return response.choices[0].message.content
+    key = ("chat", CHAT_MODEL, json.dumps(messages, sort_keys=True))
+    return await get_upstream_gate().call(key, make_call)
+
+def _upstream_error(e):
+    if isinstance(e, UpstreamBusy):
+        return ServiceError(e.status_code, e.detail, e.headers)
+    # openai.RateLimitError, without importing openai here
+    if getattr(e, "status_code", None) == 429:
+        return ServiceError(429, str(e), {"Retry-After": "5"})
+    return ServiceError(500, str(e))
+
+async def rag_query(user_query, client_openai=None, client_qdrant=None):
+    if not user_query:
+        raise ServiceError(400, "Missing 'query' in request body")
+    answer = await _route_intent(user_query)
+    if answer is not None:
+        return answer
+    client_openai = client_openai or get_openai_client()
+    client_qdrant = client_qdrant or get_qdrant_client()
+
+    start = time.perf_counter()
+    try:
+        query_embedding = await embed(client_openai, user_query)
+
+        search_results = await client_qdrant.search(
+            collection_name=collection_name,
+            query_vector=query_embedding,
+            limit=30
+        )
+        retrieved = [hit.payload for hit in search_results]
+
+        context_text = "\n".join([f"{o['name']} - {o['address']}" for o in retrieved])
+
+        prompt = f"""
+        You are a helpful assistant for McDonald's outlet search.
+
+        User Query: {user_query}
+
+        Matching Outlets:
+        {context_text}
+
+        Answer the user clearly and concisely based only on the outlets above. Do not use numbered lists. Instead, list items separated by commas for readability.
+        """
+
+        answer = await complete(client_openai, [{"role": "system", "content": prompt}])
+        intents.stats.record_llm(time.perf_counter() - start)
+        return answer
+
+    except Exception as e:
+        logging.error(f'Error in rag_query: {e}')
+        raise _upstream_error(e)
+
+async def non_rag_query(messages, client_openai=None):
+    if not messages:
+        raise ServiceError(400, "Missing 'messages' in request body")
+    # only the first question, or a later one that names outlets on its own,
+    # can be answered without the earlier turns ("what about wifi?" cannot)
+    question = messages[-1].get("content") if messages[-1].get("role") == "user" else None
+    user_turns = sum(1 for m in messages if m.get("role") == "user")
+    if question and (user_turns == 1 or intents.is_standalone(question)):
+        answer = await _route_intent(question)
+        if answer is not None:
+            return answer
+    client_openai = client_openai or get_openai_client()
+
+    start = time.perf_counter()
+    try:
+        outlet_list = await get_outlet_snapshot()
+
+        context_text = "\n".join([
+            f"{o['name']} - {o['address']} - {o.get('categories','')}" for o in outlet_list
+        ])
+
+        system_prompt = {
+            "role": "system",
+            "content": f"""
+You are a helpful assistant for McDonald's outlet search.
+
+All Outlets:
+{context_text}
+
+Use the above outlets data to answer user questions clearly and concisely. Do not use numbered lists. Instead, list items separated by commas for readability.
+"""
+        }
+
+        full_messages = [system_prompt] + messages
+
+        answer = await complete(client_openai, full_messages)
+        intents.stats.record_llm(time.perf_counter() - start)
+        return answer
+
+    except Exception as e:
+        logging.error(f'Error in non_rag_query: {e}')
+        raise _upstream_error(e)
@@ -0,0 +1,225 @@
+"""Answer structured outlet questions without calling the LLM.
+
+Questions like "how many 24h outlets" or "which outlets near Bukit Bintang
+have drive-thru" only need a lookup over the mcdonald table. OutletIndex
+precomputes the category sets and each outlet's neighbours (geodesic, sorted
+by distance) from the outlet snapshot, and route() answers from it when the
+question matches a known pattern. Anything else returns None and goes to
+the LLM as before.
+"""
+
+import re
+import time
+
+NEAR_KM = 5
+
+# user phrasing -> category label as scraped from mcdonalds.com.my; each
+# pattern matches whole words, route() removes them before checking the rest
+CATEGORY_PATTERNS = {
+    "24 Hours": r"\b24[\s-]*(?:h|hr|hrs|hour|hours)\b|\b24/7\b|\bround the clock\b",
+    "Drive-Thru": r"\bdrive[\s-]?(?:thru|through)s?\b",
+    "Birthday Party": r"\bbirthdays?\b",
+    "McCafe": r"\bmc\s?caf[eé]s?\b",
+    "McDelivery": r"\b(?:mc\s?)?deliver(?:y|ies|s)?\b",
+    "Breakfast": r"\bbreakfast\b",
+    "WiFi": r"\bwi[\s-]?fi\b",
+    "Dessert Center": r"\bdesserts?(?:\s+(?:center|centre|counter)s?)?\b",
+    "Digital Order Kiosk": r"\b(?:digital\s+)?(?:self[\s-])?order(?:ing)?\s+kiosks?\b|\bkiosks?\b|\bself[\s-]order(?:ing)?\b",
+    "Cashless Facility": r"\bcashless(?:\s+payments?)?\b",
+    "Surau": r"\bsuraus?\b|\bprayer rooms?\b",
+    "Electric Vehicle": r"\b(?:ev|electric vehicles?)(?:\s+charg(?:er|ers|ing))?\b",
+}
+
+COUNT_RE = re.compile(r"\bhow many\b|\bnumber of\b|\bcount\b")
+LIST_RE = re.compile(r"\b(which|what|list|show|find|any|where)\b")
+NEAREST_RE = re.compile(r"\b(nearest|closest)\b")
+OUTLET_NOUN_RE = re.compile(r"\b(outlets?|branch(?:es)?|restaurants?|stores?|locations?|mcdonald'?s)\b")
+PLACE_RE = re.compile(
+    r"\b(?:near|nearby|close to|around|(?:nearest|closest)(?:\s+[\w'-]+){0,3}?\s+to)\s+(?:to\s+)?(?:the\s+)?"
+    r"(.+?)(?=\s+(?:with|that|which|having|has|have|offering|offers|and)\b|[?.,!]|$)"
+)
+# "in Cheras", "at Mid Valley": an area the index has no boundaries for
+AREA_RE = re.compile(r"\b(?:in|at|inside|within|from)\s+(?!kl\b|kuala lumpur\b)")
+# follow-ups ("which of those...", "what about wifi"), negations and open-ended
+# asks need the conversation or the LLM
+FALLTHROUGH_RE = re.compile(
+    r"\b(those|these|them|they|it|that one|above|previous|why|how (?:do|does|can|to|long|much)"
+    r"|best|recommend|menu|price|when|phone|contact|call|or|not|no|never|without|except|non)\b"
+    r"|n't\b|^\s*(?:what|how) about\b|^\s*(?:and|also)\b"
+)
+# every word of a routed question must be one of these (after removing the
+# category and place phrases), so "how many outlets opened this year" is not
+# answered with the total
+KNOWN_WORDS = set("""
+    a an the all any and are is there do does can i get please me
+    which what what's whats list show find where how many number of count
+    outlet outlets branch branches restaurant restaurants store stores location locations
+    mcdonald mcdonald's mcdonalds mcd kl kuala lumpur in
+    near nearby close closest nearest to around
+    have has having with offer offers offering provide provides serve serves support supports
+    that open opens available facility facilities service services room rooms party parties charging
+""".split())
+
+def _normalize(text):
+    return re.sub(r"[^a-z0-9]", "", (text or "").lower().replace("é", "e"))
+
+def _has_category(outlet, label):
+    wanted = _normalize(label)
+    for category in (outlet.get("categories") or "").split(","):
+        category = _normalize(category)
+        if category and (wanted in category or category in wanted):
+            return True
+    return False
+
+def _place_name(outlet_name):
+    name = re.sub(r"^mcdonald'?s\s*", "", (outlet_name or "").strip(), flags=re.I)
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+def _join(names):
+    return ", ".join(names)
+
+def _count(n, description, where=""):
+    verb, noun = ("is", "outlet") if n == 1 else ("are", "outlets")
+    return f"There {verb} {n} McDonald's {noun}{description}{where}."
+
+class OutletIndex:
+    def __init__(self, outlets):
+        from geopy.distance import geodesic
+
+        self.outlets = outlets
+        self.by_category = {}
+        for label in CATEGORY_PATTERNS:
+            self.by_category[label] = [o for o in outlets if _has_category(o, label)]
+        self.places = [(_place_name(o["name"]), o) for o in outlets]
+
+        # per-outlet neighbourhood: every other outlet with its distance, nearest first
+        self.neighbours = {o["id"]: [] for o in outlets}
+        for i, a in enumerate(outlets):
+            for b in outlets[i + 1:]:
+                km = geodesic((a["latitude"], a["longitude"]), (b["latitude"], b["longitude"])).kilometers
+                self.neighbours[a["id"]].append((km, b))
+                self.neighbours[b["id"]].append((km, a))
+        for entries in self.neighbours.values():
+            entries.sort(key=lambda entry: entry[0])
+
+    def find_place(self, phrase):
+        tokens = " ".join(re.findall(r"[a-z0-9]+", re.sub(r"mcdonald'?s", "", phrase)))
+        if not tokens:
+            return None
+        matches = [o for place, o in self.places if place == tokens]
+        matches = matches or [o for place, o in self.places if re.search(rf"\b{re.escape(tokens)}\b", place)]
+        # "bukit" or "jalan" names several outlets; guessing one would be a confident wrong answer
+        return matches[0] if len(matches) == 1 else None
+
+    def route(self, question):
+        text = (question or "").lower().replace("’", "'")
+        if not text or FALLTHROUGH_RE.search(text) or AREA_RE.search(text):
+            return None
+
+        labels = [label for label, pattern in CATEGORY_PATTERNS.items() if re.search(pattern, text)]
+        # a category nobody scraped (label changed on the site) is left to the LLM
+        if any(not self.by_category[label] for label in labels):
+            return None
+
+        anchor = None
+        rest = text
+        place = PLACE_RE.search(text)
+        if place:
+            anchor = self.find_place(place.group(1))
+            if anchor is None:
+                return None
+            rest = text[:place.start(1)] + " " + text[place.end(1):]
+        for pattern in CATEGORY_PATTERNS.values():
+            rest = re.sub(pattern, " ", rest)
+        if any(word not in KNOWN_WORDS for word in re.findall(r"[a-z0-9']+", rest)):
+            return None
+
+        counting = bool(COUNT_RE.search(text))
+        nearest = bool(NEAREST_RE.search(text)) and anchor is not None and not counting
+        has_noun = bool(OUTLET_NOUN_RE.search(text))
+        if nearest:
+            if not (has_noun or labels):
+                return None
+        elif not has_noun or not (counting or (LIST_RE.search(text) and (labels or anchor))):
+            return None
+
+        wanted_ids = None
+        for label in labels:
+            ids = {o["id"] for o in self.by_category[label]}
+            wanted_ids = ids if wanted_ids is None else wanted_ids & ids
+        def wanted(o):
+            return wanted_ids is None or o["id"] in wanted_ids
+
+        description = f" with {' and '.join(labels)}" if labels else ""
+
+        if anchor is not None:
+            others = [(km, o) for km, o in self.neighbours[anchor["id"]] if wanted(o)]
+            if nearest:
+                answer = []
+                if wanted(anchor):
+                    has = f"has {' and '.join(labels)}" if labels else "is at that location"
+                    answer.append(f"{anchor['name']} itself {has}.")
+                if others:
+                    km, o = others[0]
+                    if answer:
+                        lead = f"The nearest other outlet{description}"
+                    else:
+                        lead = f"The nearest outlet{description} to {anchor['name']}"
+                    answer.append(f"{lead} is {o['name']} ({km:.1f} km), {o['address']}.")
+                return " ".join(answer) or _count(0, description)
+            nearby = [anchor["name"] + " (itself)"] if wanted(anchor) else []
+            nearby += [f"{o['name']} ({km:.1f} km)" for km, o in others if km <= NEAR_KM]
+            where = f" within {NEAR_KM} km of {anchor['name']}"
+            if counting or not nearby:
+                return _count(len(nearby), description, where)
+            return f"Outlets{description}{where}: " + _join(nearby) + "."
+
+        matched = [o for o in self.outlets if wanted(o)]
+        if counting or not matched:
+            return _count(len(matched), description)
+        return f"Outlets{description}: " + _join(o["name"] for o in matched) + "."
+
+def is_standalone(question):
+    """Whether a later message in a conversation can be answered without the earlier ones."""
+    return bool(OUTLET_NOUN_RE.search((question or "").lower()))
+
+class RouterStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.router_seconds = 0.0
+        self.llm_answers = 0
+        self.llm_seconds = 0.0
+
+    def record_route(self, hit, seconds):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.router_seconds += seconds
+
+    def record_llm(self, seconds):
+        self.llm_answers += 1
+        self.llm_seconds += seconds
+
+    def metrics(self):
+        routed = self.hits + self.misses
+        router_ms = self.router_seconds / routed * 1000 if routed else 0.0
+        llm_ms = self.llm_seconds / self.llm_answers * 1000 if self.llm_answers else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / routed, 3) if routed else 0.0,
+            "router_ms_avg": round(router_ms, 3),
+            "llm_ms_avg": round(llm_ms, 1),
+            # estimated from the average LLM answer time seen by this process
+            "latency_saved_ms": round(self.hits * max(llm_ms - router_ms, 0.0), 1),
+        }
+
+stats = RouterStats()
+
+def timed_route(index, question):
+    start = time.perf_counter()
+    answer = index.route(question)
+    stats.record_route(answer is not None, time.perf_counter() - start)
+    return answer
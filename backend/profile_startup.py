@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""Report import time and cold-start latency of the API process.
+
+Run from the project root:
+    python backend/profile_startup.py
+    python backend/profile_startup.py --path /get_outlets --top 15
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module):
+    # `-X importtime` writes one line per module to stderr:
+    # "import time: self [us] | cumulative | imported package"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+    return rows
+
+def first_request_latency(path, port, timeout):
+    env = dict(os.environ, API_WARM_UP=os.getenv("API_WARM_UP", "1"))
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        ready = None
+        while time.perf_counter() - start < timeout:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+                ready = time.perf_counter() - start
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+        if ready is None:
+            raise RuntimeError(f"API did not start within {timeout}s")
+
+        request_start = time.perf_counter()
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout).read()
+        except urllib.error.HTTPError as e:
+            print(f"{path} returned HTTP {e.code}")
+        first = time.perf_counter() - request_start
+        return ready, first
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend.api")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    parser.add_argument("--path", default="/get_outlets_geodesic", help="endpoint timed as the first request")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--skip-server", action="store_true", help="only report import time")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    top_level = [row for row in rows if row[2].strip() == args.module]
+    total_us = top_level[0][0] if top_level else sum(row[1] for row in rows)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms ({len(rows)} modules)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    if not args.skip_server:
+        ready, first = first_request_latency(args.path, args.port, args.timeout)
+        print(f"process start to ready: {ready * 1000:.1f} ms")
+        print(f"first request {args.path}: {first * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
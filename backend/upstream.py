@@ -0,0 +1,129 @@
+"""Single-flight coalescing and admission control for OpenAI calls.
+
+Identical in-flight calls (same key) share one upstream request. Distinct
+calls wait for one of UPSTREAM_MAX_CONCURRENCY slots; once
+UPSTREAM_MAX_QUEUE callers are already waiting, new ones are rejected with
+429, and callers that wait longer than UPSTREAM_QUEUE_TIMEOUT seconds get 503.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+class UpstreamBusy(Exception):
+    def __init__(self, status_code, detail, retry_after):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = {"Retry-After": str(retry_after)}
+
+class UpstreamGate:
+    def __init__(self, max_concurrency, max_queue, queue_timeout):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight = {}
+        self._waits = deque(maxlen=1000)
+        self.waited = 0
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def call(self, key, make_call):
+        """Run `make_call()` (a coroutine factory) once for all concurrent callers with the same key."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._limited(make_call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        # shield() so a caller that disconnects does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._inflight.pop(key, None)
+        # mark the exception as retrieved: if every caller disconnected nobody
+        # awaits the task and asyncio would log "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def _limited(self, make_call):
+        start = time.perf_counter()
+        if not self._semaphore.locked():
+            # a free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+        else:
+            if self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusy(429, "Too many pending upstream requests, try again shortly", 1)
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                # timed-out waits are the congested ones, keep them in the wait stats
+                self._record_wait(time.perf_counter() - start)
+                raise UpstreamBusy(503, "Timed out waiting for upstream capacity", 5)
+            finally:
+                self.queue_depth -= 1
+        self._record_wait(time.perf_counter() - start)
+
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            return await make_call()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _record_wait(self, waited):
+        self.waited += 1
+        self._waits.append(waited)
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def metrics(self):
+        waits = sorted(self._waits)
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_total / self.waited * 1000, 2) if self.waited else 0.0,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(self.wait_max * 1000, 2),
+        }
+
+_lock = threading.Lock()
+_gate = None
+
+def get_upstream_gate():
+    global _gate
+    if _gate is None:
+        with _lock:
+            if _gate is None:
+                _gate = UpstreamGate(
+                    int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "8")),
+                    int(os.getenv("UPSTREAM_MAX_QUEUE", "32")),
+                    float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "10")),
+                )
+    return _gate
@@ -2,11 +2,8 @@
 # coding: utf-8
 
 import os
-import psycopg2
-from openai import OpenAI
+import time
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams
 
 load_dotenv()
 
@@ -18,19 +15,44 @@ POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_HOST = os.getenv("POSTGRES_DOCKER_HOST")
 POSTGRES_PORT = os.getenv("POSTGRES_DOCKER_PORT")
 
+# The API searches `collection_name`, which is an alias pointing at the
+# latest versioned collection (mcd_outlet_<timestamp>), so a rebuild can be
+# swapped in atomically while the API keeps serving.
 collection_name = "mcd_outlet"
+EMBEDDING_BATCH_SIZE = 100
 
-client_qdrant = QdrantClient(QDRANT_URL)
-client_openai = OpenAI(api_key=OPENAI_API_KEY)
+# Clients and drivers are created on first use, so refresh.py can import
+# outlet_text() for a dry run without database, Qdrant or OpenAI access.
+_client_qdrant = None
+_client_openai = None
 
-def get_all_outlet():
-    conn = psycopg2.connect(
+def get_qdrant_client():
+    global _client_qdrant
+    if _client_qdrant is None:
+        from qdrant_client import QdrantClient
+        _client_qdrant = QdrantClient(QDRANT_URL)
+    return _client_qdrant
+
+def get_openai_client():
+    global _client_openai
+    if _client_openai is None:
+        from openai import OpenAI
+        _client_openai = OpenAI(api_key=OPENAI_API_KEY)
+    return _client_openai
+
+def get_connection():
+    import psycopg2
+
+    return psycopg2.connect(
         dbname=POSTGRES_DB,
         user=POSTGRES_USER,
         password=POSTGRES_PASSWORD,
         host=POSTGRES_HOST,
         port=POSTGRES_PORT
     )
+
+def get_all_outlet():
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, address, telephone, latitude, longitude, categories FROM mcdonald")
     column_names = [desc[0] for desc in cursor.description]
@@ -38,36 +60,95 @@ def get_all_outlet():
     conn.close()
     return [dict(zip(column_names, row)) for row in rows]
 
-def main():
+def outlet_text(o):
+    return (
+        f"Name: {o['name']}. "
+        f"Address: {o['address']}. "
+        f"Latitude: {o.get('latitude')}. "
+        f"Longitude: {o.get('longitude')}. "
+        f"Categories: {o.get('categories', '')}."
+    )
+
+def embed_outlets(outlets):
+    embeddings = []
+    for start in range(0, len(outlets), EMBEDDING_BATCH_SIZE):
+        batch = outlets[start:start + EMBEDDING_BATCH_SIZE]
+        response = get_openai_client().embeddings.create(
+            model="text-embedding-3-small",
+            input=[outlet_text(o) for o in batch]
+        )
+        embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    return embeddings
+
+def current_collection():
+    """Name of the collection the API is reading, or None before the first build."""
+    client_qdrant = get_qdrant_client()
+    for alias in client_qdrant.get_aliases().aliases:
+        if alias.alias_name == collection_name:
+            return alias.collection_name
     if client_qdrant.collection_exists(collection_name):
-        client_qdrant.delete_collection(collection_name)
+        return collection_name  # built before aliases were used
+    return None
 
+def load_points(collection):
+    """Existing vectors keyed by outlet id, with the text they were embedded from."""
+    client_qdrant = get_qdrant_client()
+    points = {}
+    offset = None
+    while True:
+        batch, offset = client_qdrant.scroll(
+            collection_name=collection,
+            limit=256,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        for point in batch:
+            points[point.payload["id"]] = (outlet_text(point.payload), point.vector)
+        if offset is None:
+            return points
+
+def publish_collection(points):
+    """Write points to a new versioned collection and point the alias at it."""
+    from qdrant_client.models import (
+        VectorParams, CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+    )
+
+    client_qdrant = get_qdrant_client()
+    previous = current_collection()
+    new_collection = f"{collection_name}_{int(time.time())}"
     client_qdrant.create_collection(
-        collection_name=collection_name,
+        collection_name=new_collection,
         vectors_config=VectorParams(size=1536, distance="Cosine")
     )
+    for start in range(0, len(points), 256):
+        client_qdrant.upsert(collection_name=new_collection, points=points[start:start + 256])
 
-    outlets = get_all_outlet()
-    points = []
-    for idx, o in enumerate(outlets):
-        text = (
-            f"Name: {o['name']}. "
-            f"Address: {o['address']}. "
-            f"Latitude: {o.get('latitude')}. "
-            f"Longitude: {o.get('longitude')}. "
-            f"Categories: {o.get('categories', '')}."
-        )
-        response = client_openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        embedding = response.data[0].embedding
-        points.append(PointStruct(id=idx, vector=embedding, payload=o))
+    operations = []
+    if previous == collection_name:
+        # one-off migration: an alias cannot share its name with a collection
+        client_qdrant.delete_collection(collection_name)
+    elif previous is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=collection_name)))
+    operations.append(CreateAliasOperation(
+        create_alias=CreateAlias(collection_name=new_collection, alias_name=collection_name)
+    ))
+    client_qdrant.update_collection_aliases(change_aliases_operations=operations)
 
-    client_qdrant.upsert(
-        collection_name=collection_name,
-        points=points
-    )
+    if previous not in (None, collection_name):
+        client_qdrant.delete_collection(previous)
+    return new_collection
+
+def main():
+    from qdrant_client.models import PointStruct
+
+    outlets = get_all_outlet()
+    embeddings = embed_outlets(outlets)
+    points = [
+        PointStruct(id=o["id"], vector=embedding, payload=o)
+        for o, embedding in zip(outlets, embeddings)
+    ]
+    publish_collection(points)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""Refresh outlet data end to end.
+
+Stages: scrape the outlet locator, apply the differences to the `mcdonald`
+table, re-embed only new or changed outlets into a fresh Qdrant collection,
+swap the `mcd_outlet` alias to it, then ask the API to drop its cached
+outlet snapshot.
+
+    python refresh.py                                  # one run against the live site
+    python refresh.py --interval 86400                 # keep running, once a day
+    python refresh.py --dry-run --scraped scraped.json --current current.json
+
+Fixtures are JSON lists of outlets with the columns of the `mcdonald` table
+(`--current` rows also carry `id`). A dry run only reports what would change.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import urllib.request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPDATABLE_COLUMNS = ("address", "telephone", "latitude", "longitude", "categories")
+# refuse to apply a scrape that lost most outlets, it is more likely a broken page than closures
+MIN_SCRAPE_RATIO = 0.5
+
+def load_fixture(path):
+    with open(path) as f:
+        return json.load(f)
+
+def _same(column, old, new):
+    if column in ("latitude", "longitude"):
+        return old is not None and new is not None and abs(float(old) - float(new)) < 1e-7
+    return (old or "") == (new or "")
+
+def diff_outlets(current, scraped):
+    """Match outlets by name and return (inserts, updates, deletes)."""
+    by_name, duplicates = {}, []
+    # earlier runs of scrape_and_insert.py could store an outlet more than once;
+    # keep the oldest row and delete the copies so Qdrant drops them too
+    for o in sorted(current, key=lambda o: o["id"]):
+        if o["name"] in by_name:
+            logging.warning(f"Duplicate stored outlet, deleting id {o['id']}: {o['name']}")
+            duplicates.append(o)
+        else:
+            by_name[o["name"]] = o
+    seen = set()
+    inserts, updates = [], []
+    for outlet in scraped:
+        if outlet["name"] in seen:
+            logging.warning(f"Duplicate outlet in scrape, keeping the first: {outlet['name']}")
+            continue
+        seen.add(outlet["name"])
+        existing = by_name.get(outlet["name"])
+        if existing is None:
+            inserts.append(outlet)
+        elif not all(_same(c, existing.get(c), outlet.get(c)) for c in UPDATABLE_COLUMNS):
+            updates.append(dict(outlet, id=existing["id"]))
+    deletes = [o for o in by_name.values() if o["name"] not in seen] + duplicates
+    return inserts, updates, deletes
+
+def apply_changes(inserts, updates, deletes):
+    from rag import get_connection
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cursor:
+                for o in updates:
+                    cursor.execute('''
+                        UPDATE mcdonald
+                        SET address = %s, telephone = %s, latitude = %s, longitude = %s, categories = %s,
+                            geom = ST_SetSRID(ST_MakePoint(%s, %s), 4326)::GEOGRAPHY
+                        WHERE id = %s
+                    ''', (o['address'], o['telephone'], o['latitude'], o['longitude'], o['categories'],
+                          o['longitude'], o['latitude'], o['id']))
+                for o in inserts:
+                    cursor.execute('''
+                        INSERT INTO mcdonald (name, address, telephone, latitude, longitude, categories, geom)
+                        VALUES (%s, %s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::GEOGRAPHY)
+                    ''', (o['name'], o['address'], o['telephone'], o['latitude'], o['longitude'], o['categories'],
+                          o['longitude'], o['latitude']))
+                if deletes:
+                    cursor.execute('DELETE FROM mcdonald WHERE id = ANY(%s)', ([o['id'] for o in deletes],))
+    finally:
+        conn.close()
+
+def notify_api(api_url, admin_token):
+    request = urllib.request.Request(f"{api_url.rstrip('/')}/admin/invalidate", data=b"", method="POST")
+    if admin_token:
+        request.add_header("X-Admin-Token", admin_token)
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, name, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.stages[name] = round(time.perf_counter() - start, 3)
+            logging.info(f"{name}: {self.stages[name]:.3f} s")
+
+def refresh(args):
+    timer = Timer()
+    report = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "dry_run": args.dry_run, "stages": timer.stages}
+
+    if args.scraped:
+        scraped = timer.stage("scrape", load_fixture, args.scraped)
+    else:
+        from scrape_and_insert import scrape_outlets
+        scraped = timer.stage("scrape", scrape_outlets)
+
+    if args.current:
+        current = timer.stage("load_current", load_fixture, args.current)
+    else:
+        from rag import get_all_outlet
+        current = timer.stage("load_current", get_all_outlet)
+
+    if current and len(scraped) < MIN_SCRAPE_RATIO * len(current) and not args.allow_shrink:
+        raise RuntimeError(
+            f"Scrape returned {len(scraped)} outlets against {len(current)} stored, "
+            "refusing to apply (use --allow-shrink to override)"
+        )
+
+    inserts, updates, deletes = timer.stage("diff", diff_outlets, current, scraped)
+    report["changes"] = {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+    for label, outlets in (("insert", inserts), ("update", updates), ("delete", deletes)):
+        for o in outlets:
+            logging.info(f"{label}: {o['name']}")
+
+    if args.dry_run:
+        import rag
+
+        # without Qdrant, assume the stored rows are what was last embedded;
+        # an update that leaves the embedded text alone (telephone) is not re-embedded
+        stored = {o["name"]: rag.outlet_text(o) for o in current}
+        report["reembedded"] = sum(1 for o in inserts + updates if stored.get(o["name"]) != rag.outlet_text(o))
+        logging.info(f"Dry run: would re-embed {report['reembedded']} outlets, nothing written")
+        return report
+
+    if inserts or updates or deletes:
+        timer.stage("apply", apply_changes, inserts, updates, deletes)
+
+    import rag
+    from qdrant_client.models import PointStruct
+
+    outlets = timer.stage("reload", rag.get_all_outlet)
+    previous = rag.current_collection()
+    existing = timer.stage("load_vectors", rag.load_points, previous) if previous else {}
+    stale = [o for o in outlets if existing.get(o["id"], (None,))[0] != rag.outlet_text(o)]
+    report["reembedded"] = len(stale)
+
+    if not stale and len(existing) == len(outlets):
+        logging.info("Embeddings are up to date, keeping the current collection")
+    else:
+        embeddings = dict(zip((o["id"] for o in stale), timer.stage("embed", rag.embed_outlets, stale)))
+        points = [
+            PointStruct(id=o["id"], vector=embeddings.get(o["id"]) or existing[o["id"]][1], payload=o)
+            for o in outlets
+        ]
+        report["collection"] = timer.stage("swap_collection", rag.publish_collection, points)
+
+    if args.api_url and not args.admin_token:
+        logging.warning("ADMIN_TOKEN is not set, the API will pick up the change when its snapshot TTL expires")
+    elif args.api_url:
+        try:
+            timer.stage("invalidate_api", notify_api, args.api_url, args.admin_token)
+        except Exception as e:
+            # the API still picks the change up once its snapshot TTL expires
+            logging.warning(f"Could not notify API at {args.api_url}: {e}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing anything")
+    parser.add_argument("--scraped", help="JSON fixture used instead of scraping the site")
+    parser.add_argument("--current", help="JSON fixture used instead of reading the mcdonald table")
+    parser.add_argument("--allow-shrink", action="store_true", help="apply a scrape that lost most outlets")
+    parser.add_argument("--interval", type=float, help="run forever, sleeping this many seconds between runs")
+    parser.add_argument("--report", help="append a JSON line with stage timings and counts per run")
+    parser.add_argument("--api-url", default=os.getenv("API_URL", "http://localhost:8000"),
+                        help="API to notify after a refresh, empty to skip")
+    parser.add_argument("--admin-token", default=os.getenv("ADMIN_TOKEN"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    while True:
+        try:
+            report = refresh(args)
+            logging.info(f"Refresh finished: {json.dumps(report)}")
+            if args.report:
+                with open(args.report, "a") as f:
+                    f.write(json.dumps(report) + "\n")
+        except Exception as e:
+            logging.error(f"Refresh failed: {e}")
+            if args.interval is None:
+                sys.exit(1)
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import core, intents, upstream  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+OUTLETS = [
+    {"id": 1, "name": "McDonald's Bukit Bintang", "address": "Jalan Bukit Bintang", "telephone": "03-1",
+     "latitude": 3.1466, "longitude": 101.7108, "categories": "24 Hours, Birthday Party, McCafe, WiFi"},
+    {"id": 2, "name": "McDonald's Jalan Imbi DT", "address": "Jalan Imbi", "telephone": "03-2",
+     "latitude": 3.1420, "longitude": 101.7180, "categories": "24 Hours, Drive-Thru, McDelivery"},
+    {"id": 3, "name": "McDonald's Bangsar", "address": "Jalan Telawi, Bangsar", "telephone": "03-3",
+     "latitude": 3.1300, "longitude": 101.6700, "categories": "Drive-Thru, Breakfast, McCafe"},
+    {"id": 4, "name": "McDonald's Kepong", "address": "Jalan Kepong", "telephone": "03-4",
+     "latitude": 3.2100, "longitude": 101.6300, "categories": "Drive-Thru"},
+    {"id": 5, "name": "McDonald's Suria KLCC", "address": "Suria KLCC", "telephone": "03-5",
+     "latitude": 3.1579, "longitude": 101.7119, "categories": "McCafe, WiFi"},
+]
+
+class FakeOpenAIState:
+    """Knobs and counters for the fake server, shared with its handler threads."""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.status = 200
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.url = None
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        state = self.server.state
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        state.enter()
+        try:
+            time.sleep(state.delay)
+            if state.status == 429:
+                self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                            "code": "rate_limit_exceeded"}}, {"Retry-After": "1"})
+            elif self.path.endswith("/embeddings"):
+                inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                self._reply(200, {
+                    "object": "list",
+                    "model": body["model"],
+                    "data": [{"object": "embedding", "index": i, "embedding": [0.1, 0.2, 0.3]} for i in range(len(inputs))],
+                    "usage": {"prompt_tokens": 1, "total_tokens": 1},
+                })
+            else:
+                self._reply(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "fake answer"}}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                })
+        finally:
+            state.leave()
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def fake_openai():
+    """Local OpenAI-compatible server; set `.delay` and `.status` to simulate slow or rate limited upstreams."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.state = FakeOpenAIState()
+    server.state.url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.state
+    server.shutdown()
+    server.server_close()
+
+def async_openai(state):
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(base_url=state.url, api_key="test", max_retries=0)
+
+def sync_openai(state):
+    from openai import OpenAI
+    return OpenAI(base_url=state.url, api_key="test", max_retries=0)
+
+@pytest.fixture
+def fresh_core(monkeypatch):
+    """Isolate module-level caches, which bind to the event loop of the test that first uses them."""
+    monkeypatch.setattr(core, "_snapshot_lock", asyncio.Lock())
+    monkeypatch.setattr(core, "_outlet_snapshot", None)
+    monkeypatch.setattr(core, "_outlet_index", None)
+    monkeypatch.setattr(core, "fetch_all", lambda sql: [dict(o) for o in OUTLETS])
+    monkeypatch.setattr(intents, "stats", intents.RouterStats())
+    monkeypatch.setattr(upstream, "_gate", upstream.UpstreamGate(8, 32, 10))
+    return core
@@ -0,0 +1,50 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import clients
+
+class FakePool:
+    """Mimics ThreadedConnectionPool: raises instead of waiting once maxconn connections are out."""
+
+    def __init__(self, maxconn):
+        self.maxconn = maxconn
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        with self._lock:
+            if self.used >= self.maxconn:
+                raise RuntimeError("connection pool exhausted")
+            self.used += 1
+            return object()
+
+    def putconn(self, conn):
+        with self._lock:
+            self.used -= 1
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = FakePool(2)
+    monkeypatch.setattr(clients, "_db_pool", pool)
+    monkeypatch.setattr(clients, "_db_slots", threading.BoundedSemaphore(pool.maxconn))
+    return pool
+
+def test_db_connection_waits_for_a_free_connection(fake_pool):
+    def query(_):
+        with clients.db_connection():
+            time.sleep(0.05)
+        return True
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        assert all(executor.map(query, range(10)))
+    assert fake_pool.used == 0
+
+def test_db_connection_times_out_when_pool_stays_busy(fake_pool, monkeypatch):
+    monkeypatch.setattr(clients, "DB_POOL_TIMEOUT", 0.05)
+    with clients.db_connection(), clients.db_connection():
+        with pytest.raises(TimeoutError):
+            with clients.db_connection():
+                pass
@@ -0,0 +1,53 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import core, upstream
+from conftest import async_openai, sync_openai
+
+REQUESTS = 20
+UPSTREAM_DELAY = 0.2
+# a threaded sync worker (the retired Flask app, or gunicorn --threads) holds one thread per request
+SYNC_WORKER_THREADS = 4
+
+def sync_handler(client_openai, question):
+    response = client_openai.chat.completions.create(
+        model=core.CHAT_MODEL,
+        messages=[{"role": "user", "content": question}]
+    )
+    return response.choices[0].message.content
+
+def test_async_core_keeps_more_llm_requests_in_flight_than_sync_handler(fake_openai, fresh_core, monkeypatch):
+    monkeypatch.setattr(core, "INTENT_ROUTER", False)
+    monkeypatch.setattr(upstream, "_gate", upstream.UpstreamGate(REQUESTS, REQUESTS, 10))
+    fake_openai.delay = UPSTREAM_DELAY
+
+    client = sync_openai(fake_openai)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SYNC_WORKER_THREADS) as executor:
+        answers = list(executor.map(lambda i: sync_handler(client, f"question {i}"), range(REQUESTS)))
+    sync_elapsed = time.perf_counter() - start
+    sync_peak = fake_openai.peak_in_flight
+    assert answers == ["fake answer"] * REQUESTS
+
+    fake_openai.peak_in_flight = 0
+
+    async def burst():
+        client_openai = async_openai(fake_openai)
+        try:
+            return await asyncio.gather(*[
+                core.non_rag_query([{"role": "user", "content": f"question {i}"}], client_openai)
+                for i in range(REQUESTS)
+            ])
+        finally:
+            await client_openai.close()
+
+    start = time.perf_counter()
+    answers = asyncio.run(burst())
+    async_elapsed = time.perf_counter() - start
+    async_peak = fake_openai.peak_in_flight
+    assert answers == ["fake answer"] * REQUESTS
+
+    assert sync_peak <= SYNC_WORKER_THREADS
+    assert async_peak == REQUESTS
+    assert async_elapsed < sync_elapsed / 2
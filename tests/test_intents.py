@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from backend import core, intents
+from conftest import OUTLETS
+
+# outlets whose names share a word with the ones above, as many KL outlets do
+MORE_OUTLETS = [
+    {"id": 6, "name": "McDonald's Bukit Jalil", "address": "Jalan Jalil Perkasa", "telephone": "03-6",
+     "latitude": 3.0583, "longitude": 101.6917, "categories": "Drive-Thru, Dessert Center, Digital Order Kiosk"},
+    {"id": 7, "name": "McDonald's Jalan Ipoh", "address": "Jalan Ipoh", "telephone": "03-7",
+     "latitude": 3.1720, "longitude": 101.6930, "categories": "24 Hours, WiFi"},
+]
+
+@pytest.fixture(scope="module")
+def index():
+    return intents.OutletIndex([dict(o) for o in OUTLETS])
+
+@pytest.fixture(scope="module")
+def more_index():
+    return intents.OutletIndex([dict(o) for o in OUTLETS + MORE_OUTLETS])
+
+@pytest.mark.parametrize("question, answer", [
+    ("How many 24h outlets?", "There are 2 McDonald's outlets with 24 Hours."),
+    ("how many outlets are there", "There are 5 McDonald's outlets."),
+    ("how many outlets are in KL?", "There are 5 McDonald's outlets."),
+    ("which outlets have a birthday party room", "Outlets with Birthday Party: McDonald's Bukit Bintang."),
+    ("Which outlets near Bukit Bintang have drive-thru?",
+     "Outlets with Drive-Thru within 5 km of McDonald's Bukit Bintang: "
+     "McDonald's Jalan Imbi DT (0.9 km), McDonald's Bangsar (4.9 km)."),
+    ("how many McCafé outlets near bangsar",
+     "There are 2 McDonald's outlets with McCafe within 5 km of McDonald's Bangsar."),
+    ("nearest drive-thru to Bukit Bintang",
+     "The nearest outlet with Drive-Thru to McDonald's Bukit Bintang is McDonald's Jalan Imbi DT (0.9 km), Jalan Imbi."),
+    ("which outlets have delivery", "Outlets with McDelivery: McDonald's Jalan Imbi DT."),
+    ("how many outlets offer mcdelivery", "There is 1 McDonald's outlet with McDelivery."),
+    ("which outlets have drive-thru and mccafe", "Outlets with Drive-Thru and McCafe: McDonald's Bangsar."),
+    ("how many outlets have 24 hours and wifi", "There is 1 McDonald's outlet with 24 Hours and WiFi."),
+])
+def test_structured_questions_are_answered(index, question, answer):
+    assert index.route(question) == answer
+
+@pytest.mark.parametrize("question, answer", [
+    ("which outlets have a dessert center", "Outlets with Dessert Center: McDonald's Bukit Jalil."),
+    ("how many outlets have a digital order kiosk", "There is 1 McDonald's outlet with Digital Order Kiosk."),
+    ("which outlets have self-order kiosks", "Outlets with Digital Order Kiosk: McDonald's Bukit Jalil."),
+])
+def test_multi_word_categories_are_answered(more_index, question, answer):
+    assert more_index.route(question) == answer
+
+@pytest.mark.parametrize("question, starts", [
+    ("nearest mccafe to bangsar", "McDonald's Bangsar itself has McCafe. The nearest other outlet with McCafe is "),
+    ("where is the nearest outlet to KLCC", "McDonald's Suria KLCC itself is at that location. The nearest other outlet is "),
+])
+def test_nearest_never_reports_the_named_outlet_as_its_own_neighbour(index, question, starts):
+    answer = index.route(question)
+    assert answer.startswith(starts)
+    assert "(0.0 km)" not in answer
+
+@pytest.mark.parametrize("question", [
+    # areas and words the index cannot resolve
+    "how many outlets are in Cheras?",
+    "which outlets in Bangsar have wifi",
+    "how many outlets have drive-thru in Bangsar",
+    "how many outlets opened this year",
+    "which outlets near Cheras have wifi",
+    # negations
+    "which outlets don't have drive-thru",
+    "which outlets have no wifi",
+    "which outlets are not 24 hours",
+    "which outlets without mccafe",
+    # not outlet lookups
+    "what time does breakfast end",
+    "what is mccafe",
+    "what's the delivery fee",
+    "what about wifi?",
+    "which of those have wifi",
+    "Why is McDonald's popular?",
+    # places that name more than one outlet
+    "nearest drive-thru to bukit",
+    "which outlets near jalan have wifi",
+    "how many outlets near bukit have drive-thru",
+])
+def test_other_questions_fall_through_to_the_llm(more_index, question):
+    assert more_index.route(question) is None
+
+class FakeChat:
+    def __init__(self):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, model, messages):
+        self.calls += 1
+        message = type("Message", (), {"content": "llm answer"})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+def test_non_rag_query_keeps_follow_ups_with_the_llm(fresh_core):
+    client = FakeChat()
+    first = [
+        {"role": "assistant", "content": "Hello, how can I help you?"},
+        {"role": "user", "content": "which outlets have drive-thru"},
+    ]
+    follow_up = first + [
+        {"role": "assistant", "content": "Outlets with Drive-Thru: ..."},
+        {"role": "user", "content": "what about wifi?"},
+    ]
+
+    assert asyncio.run(core.non_rag_query(first, client)).startswith("Outlets with Drive-Thru: ")
+    assert client.calls == 0
+    assert asyncio.run(core.non_rag_query(follow_up, client)) == "llm answer"
+    assert client.calls == 1
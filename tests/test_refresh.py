@@ -0,0 +1,85 @@
+import os
+import argparse
+
+import pytest
+from fastapi.testclient import TestClient
+
+import refresh
+from conftest import FIXTURES
+
+def fixture_args(**overrides):
+    args = dict(
+        dry_run=True,
+        scraped=os.path.join(FIXTURES, "scraped.json"),
+        current=os.path.join(FIXTURES, "current.json"),
+        allow_shrink=False,
+        api_url="",
+        admin_token=None,
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def test_diff_outlets_matches_by_name():
+    current = refresh.load_fixture(os.path.join(FIXTURES, "current.json"))
+    scraped = refresh.load_fixture(os.path.join(FIXTURES, "scraped.json"))
+
+    inserts, updates, deletes = refresh.diff_outlets(current, scraped)
+
+    assert [o["name"] for o in inserts] == ["McDonald's Suria KLCC"]
+    assert [(o["id"], o["name"]) for o in updates] == [(2, "McDonald's Jalan Imbi DT"), (3, "McDonald's Bangsar")]
+    assert [o["id"] for o in deletes] == [4]
+
+def test_diff_outlets_ignores_float_noise_and_duplicate_scrapes():
+    current = [{"id": 1, "name": "A", "address": "x", "telephone": "1", "latitude": 3.1, "longitude": 101.7, "categories": ""}]
+    scraped = [
+        {"name": "A", "address": "x", "telephone": "1", "latitude": 3.1 + 1e-9, "longitude": 101.7, "categories": None},
+        {"name": "A", "address": "moved", "telephone": "1", "latitude": 3.2, "longitude": 101.7, "categories": ""},
+    ]
+    assert refresh.diff_outlets(current, scraped) == ([], [], [])
+
+def test_diff_outlets_deletes_stored_duplicates_and_keeps_the_oldest_row():
+    row = {"name": "A", "address": "x", "telephone": "1", "latitude": 3.1, "longitude": 101.7, "categories": ""}
+    current = [dict(row, id=7), dict(row, id=3, address="old"), dict(row, id=9)]
+
+    inserts, updates, deletes = refresh.diff_outlets(current, [row])
+
+    assert inserts == []
+    assert [o["id"] for o in updates] == [3]
+    assert sorted(o["id"] for o in deletes) == [7, 9]
+
+def test_dry_run_reports_changes_without_counting_telephone_only_updates():
+    report = refresh.refresh(fixture_args())
+
+    assert report["dry_run"] is True
+    assert report["changes"] == {"inserted": 1, "updated": 2, "deleted": 1}
+    # Bangsar's categories changed and Suria KLCC is new; Jalan Imbi only changed its telephone
+    assert report["reembedded"] == 2
+    assert set(report["stages"]) == {"scrape", "load_current", "diff"}
+
+def test_dry_run_refuses_a_scrape_that_lost_most_outlets(tmp_path):
+    empty = tmp_path / "empty.json"
+    empty.write_text("[]")
+    with pytest.raises(RuntimeError, match="refusing to apply"):
+        refresh.refresh(fixture_args(scraped=str(empty)))
+    assert refresh.refresh(fixture_args(scraped=str(empty), allow_shrink=True))["changes"]["deleted"] == 4
+
+@pytest.mark.parametrize("configured, sent, status", [
+    (None, None, 403),
+    (None, "anything", 403),
+    ("secret", "wrong", 403),
+    ("secret", "secret", 200),
+])
+def test_invalidate_requires_a_configured_admin_token(fresh_core, monkeypatch, configured, sent, status):
+    from backend.api import app
+
+    if configured is None:
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    else:
+        monkeypatch.setenv("ADMIN_TOKEN", configured)
+    headers = {"X-Admin-Token": sent} if sent else {}
+
+    response = TestClient(app).post("/admin/invalidate", headers=headers)
+
+    assert response.status_code == status
+    if status == 200:
+        assert response.json() == {"outlets": 5, "status": "success"}
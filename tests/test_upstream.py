@@ -0,0 +1,98 @@
+import gc
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import core, upstream
+from backend.clients import get_openai_client, get_qdrant_client
+from conftest import async_openai
+
+def ask(i):
+    return [{"role": "user", "content": f"open-ended question {i}"}]
+
+async def run_with_client(state, make_calls):
+    client_openai = async_openai(state)
+    try:
+        return await asyncio.gather(*make_calls(client_openai), return_exceptions=True)
+    finally:
+        await client_openai.close()
+
+@pytest.fixture
+def no_router(fresh_core, monkeypatch):
+    monkeypatch.setattr(core, "INTENT_ROUTER", False)
+
+def test_identical_in_flight_calls_share_one_upstream_request(fake_openai, fresh_core):
+    fake_openai.delay = 0.2
+    results = asyncio.run(run_with_client(
+        fake_openai, lambda client: [core.embed(client, "24 hour outlets") for _ in range(10)]
+    ))
+    assert results == [[0.1, 0.2, 0.3]] * 10
+    assert fake_openai.requests == 1
+    assert upstream.get_upstream_gate().metrics()["coalesced"] == 9
+
+def test_full_queue_is_rejected_with_429(fake_openai, no_router, monkeypatch):
+    monkeypatch.setattr(upstream, "_gate", upstream.UpstreamGate(1, 1, 10))
+    fake_openai.delay = 0.3
+    results = asyncio.run(run_with_client(
+        fake_openai, lambda client: [core.non_rag_query(ask(i), client) for i in range(3)]
+    ))
+    rejected = [r for r in results if isinstance(r, core.ServiceError)]
+    assert results.count("fake answer") == 2
+    assert [r.status_code for r in rejected] == [429]
+    assert rejected[0].headers == {"Retry-After": "1"}
+    assert fake_openai.requests == 2
+    assert upstream.get_upstream_gate().metrics()["rejected"] == 1
+
+def test_queue_wait_timeout_returns_503_and_is_counted_in_wait_time(fake_openai, no_router, monkeypatch):
+    monkeypatch.setattr(upstream, "_gate", upstream.UpstreamGate(1, 5, 0.1))
+    fake_openai.delay = 0.4
+    results = asyncio.run(run_with_client(
+        fake_openai, lambda client: [core.non_rag_query(ask(i), client) for i in range(2)]
+    ))
+    timed_out = [r for r in results if isinstance(r, core.ServiceError)]
+    assert [r.status_code for r in timed_out] == [503]
+    metrics = upstream.get_upstream_gate().metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_ms_max"] >= 100
+    assert metrics["wait_ms_p95"] >= 100
+
+def test_upstream_rate_limit_is_passed_through_as_429(fake_openai, no_router):
+    fake_openai.status = 429
+    results = asyncio.run(run_with_client(fake_openai, lambda client: [core.non_rag_query(ask(0), client)]))
+    assert isinstance(results[0], core.ServiceError)
+    assert results[0].status_code == 429
+
+def test_upstream_rate_limit_reaches_http_client_as_429(fake_openai, no_router):
+    from backend.api import app
+
+    fake_openai.status = 429
+    app.dependency_overrides[get_openai_client] = lambda: async_openai(fake_openai)
+    app.dependency_overrides[get_qdrant_client] = lambda: object()  # never reached, embedding fails first
+    try:
+        response = TestClient(app).post("/rag_query", json={"query": "tell me about the menu"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
+
+def test_failed_shared_call_with_no_remaining_callers_is_not_reported_as_unretrieved():
+    reported = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: reported.append(context))
+        gate = upstream.UpstreamGate(1, 1, 1)
+
+        async def failing_call():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upstream failed")
+
+        caller = asyncio.ensure_future(gate.call("key", failing_call))
+        await asyncio.sleep(0.01)
+        caller.cancel()  # the client disconnected
+        await asyncio.sleep(0.1)
+        gc.collect()
+
+    asyncio.run(main())
+    gc.collect()
+    assert not [c for c in reported if "never retrieved" in c.get("message", "")]